@@ -0,0 +1,503 @@
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import hashlib
+import argparse
+import threading
+import subprocess
+import concurrent.futures
+
+MANIFEST_NAME = "manifest.json"
+SUMMARY_NAME = "summary.json"
+LOCK_DIR = "locks"
+REPORT_DIR = "reports"
+# 锁超过该时间未刷新心跳即视为持有者已退出（心跳间隔为其四分之一，最长60秒）
+DEFAULT_STALE_LOCK_SECONDS = 5 * 60
+
+
+def compute_fingerprint(file_path, chunk_size=1024 * 1024):
+    """计算文件的 sha256 指纹，用于确认各节点使用的是同一份 Master 文件"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(file_path, data):
+    """先写临时文件再替换，避免其他节点读到写了一半的 JSON"""
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, file_path)
+
+
+def _read_json(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _partition_name(partition_id):
+    return f"part-{partition_id:05d}"
+
+
+def _read_lock(lock_path):
+    """读取锁文件内容，文件不存在或尚未写完时返回 None"""
+    try:
+        return _read_json(lock_path)
+    except (OSError, ValueError):
+        return None
+
+
+def _rename_no_replace(src, dst):
+    """重命名但不覆盖已存在的目标文件（Windows 的 rename 本身不会覆盖）"""
+    if os.name == 'nt':
+        os.rename(src, dst)
+    else:
+        os.link(src, dst)
+        os.remove(src)
+
+
+class BatchCoordinator:
+    """生成分区工作清单，并在所有节点完成后合并各分区的结果报告"""
+
+    def __init__(self, work_dir, log_callback=None):
+        self.work_dir = work_dir
+        self.log_callback = log_callback or (lambda msg: None)
+
+    def log(self, message):
+        self.log_callback(message)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.work_dir, MANIFEST_NAME)
+
+    def create_manifest(self, processor, partition_size=500):
+        """根据 ExcelProcessor 当前的设置写出工作清单
+        Args:
+            processor: 已设置 Master 文件、目标文件夹和列索引的 ExcelProcessor
+            partition_size: 每个分区包含的文件数
+        """
+        if not processor.master_file_path or not processor.target_folder:
+            raise ValueError("请先选择 Master 文件和目标文件夹！")
+        if partition_size <= 0:
+            raise ValueError("分区大小必须大于0")
+        if os.path.exists(self.manifest_path):
+            raise ValueError(f"工作目录中已存在清单：{self.manifest_path}")
+        # 残留的报告或锁属于上一次运行，复用会让 worker 跳过分区、merge 合并旧结果
+        for sub_dir in (REPORT_DIR, LOCK_DIR):
+            path = os.path.join(self.work_dir, sub_dir)
+            if os.path.isdir(path) and os.listdir(path):
+                raise ValueError(f"工作目录中残留上次运行的文件，请清空后重试：{path}")
+
+        os.makedirs(os.path.join(self.work_dir, LOCK_DIR), exist_ok=True)
+        os.makedirs(os.path.join(self.work_dir, REPORT_DIR), exist_ok=True)
+
+        self.log("正在计算 Master 文件指纹...")
+        fingerprint = compute_fingerprint(processor.master_file_path)
+
+        file_paths = processor.collect_target_files()
+        self.log(f"找到 {len(file_paths)} 个目标文件")
+
+        # 存储相对路径，便于不同主机以不同挂载路径访问同一共享目录
+        relative_paths = [os.path.relpath(fp, processor.target_folder) for fp in file_paths]
+        partitions = [
+            {
+                'id': partition_id,
+                'files': relative_paths[start:start + partition_size],
+            }
+            for partition_id, start in enumerate(range(0, len(relative_paths), partition_size))
+        ]
+
+        manifest = {
+            'created_at': time.time(),
+            'master_file': os.path.abspath(processor.master_file_path),
+            'master_fingerprint': fingerprint,
+            'target_folder': os.path.abspath(processor.target_folder),
+            'columns': {
+                'match': processor.match_column_index,
+                'content': processor.content_column_index,
+                'update': processor.update_column_index,
+            },
+            'total_files': len(relative_paths),
+            'partitions': partitions,
+        }
+        _write_json_atomic(self.manifest_path, manifest)
+        self.log(f"已生成 {len(partitions)} 个分区的工作清单：{self.manifest_path}")
+        return manifest
+
+    def merge_reports(self):
+        """合并所有分区报告，返回并写出汇总结果"""
+        manifest = _read_json(self.manifest_path)
+        report_dir = os.path.join(self.work_dir, REPORT_DIR)
+
+        updated_count = 0
+        processed_files = 0
+        failed_files = []
+        missing_partitions = []
+        workers = set()
+        for partition in manifest['partitions']:
+            report_path = os.path.join(report_dir, f"{_partition_name(partition['id'])}.json")
+            if not os.path.exists(report_path):
+                missing_partitions.append(partition['id'])
+                continue
+            report = _read_json(report_path)
+            updated_count += report['updated_count']
+            processed_files += len(report['files'])
+            failed_files.extend(report['failed_files'])
+            workers.add(report['worker_id'])
+
+        summary = {
+            'total_files': manifest['total_files'],
+            'processed_files': processed_files,
+            'updated_count': updated_count,
+            'failed_files': failed_files,
+            'missing_partitions': missing_partitions,
+            'workers': sorted(workers),
+            'complete': not missing_partitions,
+            # 所有分区完成且没有处理失败的文件才算成功
+            'success': not missing_partitions and not failed_files,
+        }
+        _write_json_atomic(os.path.join(self.work_dir, SUMMARY_NAME), summary)
+
+        self.log(f"已合并 {len(manifest['partitions']) - len(missing_partitions)}/{len(manifest['partitions'])} 个分区，"
+                 f"共更新 {updated_count} 处数据")
+        if missing_partitions:
+            self.log(f"尚未完成的分区：{missing_partitions}")
+        if failed_files:
+            self.log(f"处理失败的文件数：{len(failed_files)}")
+            for failed in failed_files:
+                self.log(f"  {failed['file']}：{failed['error']}")
+        return summary
+
+
+class BatchWorker:
+    """从工作清单中通过锁文件认领分区并逐个处理，可在多个进程或主机上同时运行"""
+
+    def __init__(self, work_dir, worker_id=None, log_callback=None,
+                 master_file=None, target_folder=None, stale_lock_seconds=DEFAULT_STALE_LOCK_SECONDS,
+                 max_workers=32, post_process=False):
+        self.work_dir = work_dir
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.log_callback = log_callback or (lambda msg: None)
+        # 不同主机挂载路径可能不同，允许覆盖清单中的路径
+        self.master_file = master_file
+        self.target_folder = target_folder
+        self.stale_lock_seconds = stale_lock_seconds
+        self.max_workers = max_workers
+        self.post_process = post_process
+        # 处理期间定期刷新锁文件的修改时间，避免长时间运行的分区被误判为超时
+        self.heartbeat_seconds = max(1.0, min(60.0, stale_lock_seconds / 4))
+        self._lock_infos = {}
+
+    def log(self, message):
+        self.log_callback(f"[{self.worker_id}] {message}")
+
+    def _lock_path(self, partition_id):
+        return os.path.join(self.work_dir, LOCK_DIR, f"{_partition_name(partition_id)}.lock")
+
+    def _report_path(self, partition_id):
+        return os.path.join(self.work_dir, REPORT_DIR, f"{_partition_name(partition_id)}.json")
+
+    def _claim_partition(self, partition_id):
+        """以独占方式创建锁文件认领分区，成功返回 True"""
+        if os.path.exists(self._report_path(partition_id)):
+            return False
+
+        lock_path = self._lock_path(partition_id)
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if not self._break_stale_lock(lock_path):
+                return False
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                return False
+
+        lock_info = {'worker_id': self.worker_id, 'claimed_at': time.time(), 'token': uuid.uuid4().hex}
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(lock_info, f)
+        self._lock_infos[partition_id] = lock_info
+
+        # 认领期间其他节点可能已经完成了该分区
+        if os.path.exists(self._report_path(partition_id)):
+            self._release_partition(partition_id)
+            return False
+        return True
+
+    def _owns_lock(self, partition_id):
+        return _read_lock(self._lock_path(partition_id)) == self._lock_infos.get(partition_id)
+
+    def _release_partition(self, partition_id):
+        """只删除仍属于本节点的锁，锁已被其他节点回收时保留对方的锁"""
+        try:
+            if self._owns_lock(partition_id):
+                os.remove(self._lock_path(partition_id))
+            else:
+                self.log(f"分区 {partition_id} 的锁已被其他节点接管")
+        except FileNotFoundError:
+            pass
+        finally:
+            self._lock_infos.pop(partition_id, None)
+
+    def _heartbeat(self, partition_id, stop_event, abort_event):
+        """定期刷新锁文件的修改时间，作为本节点仍在处理该分区的心跳
+
+        发现锁已不属于本节点时设置 abort_event，通知处理流程停止写入文件。
+        """
+        while not stop_event.wait(self.heartbeat_seconds):
+            try:
+                if not self._owns_lock(partition_id):
+                    self.log(f"分区 {partition_id} 的锁已丢失，停止处理")
+                    abort_event.set()
+                    return
+                os.utime(self._lock_path(partition_id))
+            except OSError as e:
+                self.log(f"刷新分区 {partition_id} 的锁失败：{str(e)}")
+
+    def _break_stale_lock(self, lock_path):
+        """回收超时的锁：先重命名，再确认重命名的正是检查过的那份锁，否则放回并放弃"""
+        try:
+            mtime = os.path.getmtime(lock_path)
+        except FileNotFoundError:
+            return True
+        if time.time() - mtime < self.stale_lock_seconds:
+            return False
+        lock_info = _read_lock(lock_path)
+
+        stale_path = f"{lock_path}.stale-{uuid.uuid4().hex}"
+        try:
+            os.rename(lock_path, stale_path)
+        except OSError:
+            return False
+
+        # 检查与重命名之间，原持有者可能刷新了心跳，或其他节点已回收并重新创建了锁
+        try:
+            renamed_mtime = os.path.getmtime(stale_path)
+        except OSError:
+            return False
+        if renamed_mtime != mtime or _read_lock(stale_path) != lock_info:
+            try:
+                _rename_no_replace(stale_path, lock_path)
+            except OSError:
+                self.log(f"无法恢复锁 {os.path.basename(lock_path)}，保留为 {os.path.basename(stale_path)}")
+            return False
+
+        try:
+            os.remove(stale_path)
+        except OSError:
+            pass
+        self.log(f"回收超时的锁：{os.path.basename(lock_path)}")
+        return True
+
+    def _build_processor(self, manifest):
+        from excel_processor import ExcelProcessor
+
+        processor = ExcelProcessor(self.log)
+        processor.set_master_file(self.master_file or manifest['master_file'])
+        processor.set_target_folder(self.target_folder or manifest['target_folder'])
+        processor.set_match_column(manifest['columns']['match'])
+        processor.set_content_column(manifest['columns']['content'])
+        processor.set_update_column(manifest['columns']['update'])
+        return processor
+
+    def run(self):
+        """处理分区直到每个分区都有报告，返回本节点完成的分区数
+
+        被其他节点锁定的分区会定期重新检查，持有者退出后锁超时即可接管。
+        """
+        manifest = _read_json(os.path.join(self.work_dir, MANIFEST_NAME))
+        processor = self._build_processor(manifest)
+
+        fingerprint = compute_fingerprint(processor.master_file_path)
+        if fingerprint != manifest['master_fingerprint']:
+            raise ValueError("Master 文件指纹与工作清单不一致，请确认 Master 文件未被修改")
+
+        # 在认领分区之前读取 Master，读取失败时不会留下锁文件
+        master_dict = processor.load_master_dict()
+        self.log(f"Master 中共找到 {len(master_dict)} 个有效 Key")
+
+        completed = 0
+        while True:
+            pending = [
+                partition for partition in manifest['partitions']
+                if not os.path.exists(self._report_path(partition['id']))
+            ]
+            if not pending:
+                break
+
+            claimed_any = False
+            for partition in pending:
+                if not self._claim_partition(partition['id']):
+                    continue
+                claimed_any = True
+                stop_event = threading.Event()
+                abort_event = threading.Event()
+                heartbeat = threading.Thread(
+                    target=self._heartbeat, args=(partition['id'], stop_event, abort_event), daemon=True
+                )
+                heartbeat.start()
+                try:
+                    if self._process_partition(processor, master_dict, partition, abort_event):
+                        completed += 1
+                finally:
+                    stop_event.set()
+                    heartbeat.join()
+                    self._release_partition(partition['id'])
+
+            # 剩余分区都被其他节点锁定，等待其完成或锁超时后再检查
+            if not claimed_any:
+                time.sleep(self.heartbeat_seconds)
+
+        self.log(f"本节点共完成 {completed} 个分区")
+        return completed
+
+    def _process_partition(self, processor, master_dict, partition, abort_event):
+        """处理一个分区并写出报告；锁丢失而中止时不写报告并返回 False"""
+        start_time = time.time()
+        file_paths = [os.path.join(processor.target_folder, fp) for fp in partition['files']]
+        self.log(f"开始处理分区 {partition['id']}，共 {len(file_paths)} 个文件")
+
+        results = {}
+        failed_files = []
+        max_workers = max(1, min(self.max_workers, len(file_paths)))
+
+        def update_file(file_path):
+            # 锁丢失后尚未开始的文件直接跳过，避免与接管的节点同时写同一批文件
+            if abort_event.is_set():
+                return None
+            return processor._update_single_file(file_path, master_dict)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(update_file, fp): rel_path
+                for fp, rel_path in zip(file_paths, partition['files'])
+            }
+            for future in concurrent.futures.as_completed(futures):
+                rel_path = futures[future]
+                try:
+                    updated = future.result()
+                except Exception as e:
+                    self.log(f"处理文件 {rel_path} 时出错：{str(e)}")
+                    failed_files.append({'file': rel_path, 'error': str(e)})
+                    continue
+                if updated is not None:
+                    results[rel_path] = updated
+
+        if not abort_event.is_set() and self.post_process:
+            processor._post_process([
+                os.path.join(processor.target_folder, rel_path)
+                for rel_path, updated in results.items() if updated
+            ])
+
+        # 后处理可能耗时较长，写报告前再次确认锁仍属于本节点
+        if abort_event.is_set() or not self._owns_lock(partition['id']):
+            self.log(f"分区 {partition['id']} 的锁已丢失，已中止且不写出报告")
+            return False
+
+        report = {
+            'partition_id': partition['id'],
+            'worker_id': self.worker_id,
+            'started_at': start_time,
+            'finished_at': time.time(),
+            'updated_count': sum(results.values()),
+            'files': results,
+            'failed_files': failed_files,
+        }
+        _write_json_atomic(self._report_path(partition['id']), report)
+        self.log(f"分区 {partition['id']} 完成，更新 {report['updated_count']} 处数据，"
+                 f"耗时: {report['finished_at'] - start_time:.2f}秒")
+        return True
+
+
+def run_local(work_dir, num_workers, extra_args=None):
+    """在本机启动多个 worker 进程处理同一份清单，用于本地验证多节点流程"""
+    command = [sys.executable, os.path.abspath(__file__), 'work', work_dir] + list(extra_args or [])
+    processes = [
+        subprocess.Popen(command + ['--worker-id', f"{socket.gethostname()}-local{index}"])
+        for index in range(num_workers)
+    ]
+    return [process.wait() for process in processes]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Excel 批量更新的分区多节点模式")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    plan_parser = subparsers.add_parser('plan', help="生成分区工作清单")
+    plan_parser.add_argument('work_dir')
+    plan_parser.add_argument('master_file')
+    plan_parser.add_argument('target_folder')
+    plan_parser.add_argument('--match-column', type=int, default=2, help="匹配列（从1开始）")
+    plan_parser.add_argument('--content-column', type=int, default=4, help="内容列（Master表，从1开始）")
+    plan_parser.add_argument('--update-column', type=int, default=3, help="更新列（目标文件，从1开始）")
+    plan_parser.add_argument('--partition-size', type=int, default=500)
+
+    for name, help_text in (('work', "认领并处理分区"), ('local', "在本机启动多个 worker 进程")):
+        work_parser = subparsers.add_parser(name, help=help_text)
+        work_parser.add_argument('work_dir')
+        work_parser.add_argument('--master-file', help="覆盖清单中的 Master 文件路径")
+        work_parser.add_argument('--target-folder', help="覆盖清单中的目标文件夹路径")
+        work_parser.add_argument('--stale-lock-seconds', type=float, default=DEFAULT_STALE_LOCK_SECONDS)
+        work_parser.add_argument('--threads', type=int, default=32)
+        work_parser.add_argument('--post-process', action='store_true', help="处理后用 Excel 重新保存以确保兼容性")
+        if name == 'work':
+            work_parser.add_argument('--worker-id')
+        else:
+            work_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+
+    merge_parser = subparsers.add_parser('merge', help="合并各分区结果报告")
+    merge_parser.add_argument('work_dir')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'plan':
+        from excel_processor import ExcelProcessor
+
+        if min(args.match_column, args.content_column, args.update_column) <= 0:
+            parser.error("列索引必须大于0")
+        processor = ExcelProcessor(print)
+        processor.set_master_file(args.master_file)
+        processor.set_target_folder(args.target_folder)
+        processor.set_match_column(args.match_column - 1)
+        processor.set_content_column(args.content_column - 1)
+        processor.set_update_column(args.update_column - 1)
+        BatchCoordinator(args.work_dir, print).create_manifest(processor, args.partition_size)
+        return 0
+
+    if args.command == 'merge':
+        summary = BatchCoordinator(args.work_dir, print).merge_reports()
+        return 0 if summary['success'] else 1
+
+    if args.command == 'local':
+        worker_args = ['--stale-lock-seconds', str(args.stale_lock_seconds), '--threads', str(args.threads)]
+        if args.master_file:
+            worker_args += ['--master-file', args.master_file]
+        if args.target_folder:
+            worker_args += ['--target-folder', args.target_folder]
+        if args.post_process:
+            worker_args.append('--post-process')
+        return_codes = run_local(args.work_dir, args.workers, worker_args)
+        summary = BatchCoordinator(args.work_dir, print).merge_reports()
+        return 0 if summary['success'] and not any(return_codes) else 1
+
+    worker = BatchWorker(
+        args.work_dir,
+        worker_id=args.worker_id,
+        log_callback=print,
+        master_file=args.master_file,
+        target_folder=args.target_folder,
+        stale_lock_seconds=args.stale_lock_seconds,
+        max_workers=args.threads,
+        post_process=args.post_process,
+    )
+    worker.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
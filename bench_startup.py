@@ -0,0 +1,52 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+from main import STARTUP_BENCH_ENV
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+
+
+def measure_once(command, timeout=60):
+    """启动一次程序，返回 (窗口显示耗时秒数, 显示时已加载的重量级模块)"""
+    env = dict(os.environ, **{STARTUP_BENCH_ENV: '1'})
+    start_time = time.time()
+    result = subprocess.run(command, env=env, capture_output=True, text=True, timeout=timeout)
+    for line in result.stdout.splitlines():
+        line = line.strip()
+        if line.startswith('{'):
+            report = json.loads(line)
+            return report['visible_at'] - start_time, report['heavy_modules']
+    raise RuntimeError(f"未获取到启动报告（退出码 {result.returncode}）：{result.stderr.strip()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量程序从启动到窗口显示的耗时")
+    parser.add_argument('--exe', help="测量 PyInstaller 打包后的程序，默认测量 main.py")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, help="中位数超过该值时返回非零退出码")
+    args = parser.parse_args(argv)
+
+    command = [args.exe] if args.exe else [sys.executable, MAIN_SCRIPT]
+    timings = []
+    for index in range(1, args.runs + 1):
+        elapsed, heavy_modules = measure_once(command)
+        timings.append(elapsed)
+        print(f"第 {index} 次：窗口显示耗时 {elapsed:.3f}秒")
+        if heavy_modules:
+            print(f"  警告：窗口显示前已加载 {', '.join(heavy_modules)}")
+
+    median = statistics.median(timings)
+    print(f"中位数: {median:.3f}秒  最小: {min(timings):.3f}秒  最大: {max(timings):.3f}秒")
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"窗口显示耗时超过阈值 {args.max_seconds:.3f}秒")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -56,13 +56,8 @@ class ExcelProcessor:
             if not found:
                 self.log(f"Debug - 未找到Key: {key}")
 
-    def process_files(self):
-        if not self.master_file_path or not self.target_folder:
-            raise ValueError("请先选择 Master 文件和目标文件夹！")
-
-        # 记录开始时间
-        start_time = time.time()
-
+    def load_master_dict(self):
+        """读取 Master 文件，返回 {Key|匹配值: 内容} 字典"""
         try:
             self.log("正在读取 Master 文件...")
             master_start_time = time.time()
@@ -95,14 +90,10 @@ class ExcelProcessor:
                     combined_key = f"{key}|{match_val}"
                     master_dict[combined_key] = content_val
 
+        return master_dict
 
-        self.log(f"Master 中共找到 {len(master_dict)} 个有效 Key")
-        
-        # 添加调试日志，打印特定key的内容
-        # self.debug_key_info(master_dict, self.debug_keys)
-
-        # 收集目标文件
-        
+    def collect_target_files(self):
+        """递归收集目标文件夹中的 Excel 文件，按路径排序保证结果稳定"""
         file_paths = []
         for root, _, files in os.walk(self.target_folder):
             file_paths.extend(
@@ -110,6 +101,25 @@ class ExcelProcessor:
                 for file in files
                 if file.lower().endswith(('.xlsx', '.xls'))
             )
+        file_paths.sort()
+        return file_paths
+
+    def process_files(self):
+        if not self.master_file_path or not self.target_folder:
+            raise ValueError("请先选择 Master 文件和目标文件夹！")
+
+        # 记录开始时间
+        start_time = time.time()
+
+        master_dict = self.load_master_dict()
+
+        self.log(f"Master 中共找到 {len(master_dict)} 个有效 Key")
+        
+        # 添加调试日志，打印特定key的内容
+        # self.debug_key_info(master_dict, self.debug_keys)
+
+        # 收集目标文件
+        file_paths = self.collect_target_files()
 
         self.log(f"找到 {len(file_paths)} 个目标文件")
 
@@ -136,17 +146,21 @@ class ExcelProcessor:
         return updated_count
 
     def _process_single_file(self, file_path, master_dict):
+        try:
+            return self._update_single_file(file_path, master_dict)
+        except Exception:
+            return 0
+
+    def _update_single_file(self, file_path, master_dict):
+        """更新单个文件并返回更新数，文件无法读取或保存时抛出异常"""
         updates = {}
         updated = 0
-        
+
+        # 使用openpyxl的只读模式读取文件
+        wb = openpyxl.load_workbook(filename=file_path, read_only=True)
         try:
-            # 使用openpyxl的只读模式读取文件
-            wb = openpyxl.load_workbook(filename=file_path, read_only=True)
             ws = wb.active
-            
-            # 获取目标列的索引
-            key_col = 'A'  # 第一列
-            match_col = chr(ord('A') + self.match_column_index)  # 匹配列
+
             for idx, row in enumerate(ws.rows, start=1):
                 try:
                     # 只读取需要的列
@@ -171,34 +185,28 @@ class ExcelProcessor:
 
                 except Exception:
                     continue
-            
+        finally:
             # 关闭只读工作簿
             wb.close()
-            
-            # 如果有更新，重新打开文件进行写入
-            if updates:
-                try:
-                    wb = openpyxl.load_workbook(file_path)
-                    ws = wb.active
-                    
-                    # 批量更新单元格
-                    for (row, col), value in updates.items():
-                        # 使用正确的方法获取和设置单元格值
-                        cell = ws._get_cell(row, col)
-                        if cell is None:
-                            cell = ws._cell(row, col)
-                        cell.value = value
-                        
-                    wb.save(file_path)
-                except Exception:
-                    return 0
-                finally:
-                    if wb:
-                        wb.close()
+
+        # 如果有更新，重新打开文件进行写入
+        if updates:
+            wb = openpyxl.load_workbook(file_path)
+            try:
+                ws = wb.active
+                
+                # 批量更新单元格
+                for (row, col), value in updates.items():
+                    # 使用正确的方法获取和设置单元格值
+                    cell = ws._get_cell(row, col)
+                    if cell is None:
+                        cell = ws._cell(row, col)
+                    cell.value = value
                     
-        except Exception as e:
-            return 0
-            
+                wb.save(file_path)
+            finally:
+                wb.close()
+
         return updated
         
     def _post_process(self, file_paths):
@@ -1,13 +1,49 @@
 import os
 os.environ['TK_SILENCE_DEPRECATION'] = '1'
+import sys
+import json
+import time
+import threading
+import functools
+import importlib
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from excel_processor import ExcelProcessor
-from excel_cleaner import ExcelColumnClearer
-from excel_compatibility_processor import ExcelCompatibilityProcessor
+
+# 设置该环境变量后，窗口显示时输出启动耗时并退出，供 bench_startup.py 使用
+STARTUP_BENCH_ENV = 'TM_BUILDER_STARTUP_BENCH'
+# 启动时不应加载的重量级模块
+HEAVY_MODULES = ('pandas', 'openpyxl', 'win32com')
+# 后台线程只预加载纯 Python 依赖。win32com 导入时只为当前线程初始化 COM，
+# 而各工具在主线程调用 Dispatch，因此工具模块必须在主线程首次使用时导入。
+PRELOAD_MODULES = ('pandas', 'openpyxl')
+
+
+# 各工具模块会导入 pandas/openpyxl/win32com，改为首次使用时再导入以加快窗口显示。
+# 加载函数只负责导入并返回工具的构造函数，保留静态 import 以便 PyInstaller 分析依赖。
+def _load_excel_processor():
+    from excel_processor import ExcelProcessor
+    return functools.partial(ExcelProcessor, print)
+
+
+def _load_excel_cleaner():
+    from excel_cleaner import ExcelColumnClearer
+    return ExcelColumnClearer
+
+
+def _load_excel_compatibility_processor():
+    from excel_compatibility_processor import ExcelCompatibilityProcessor
+    return ExcelCompatibilityProcessor
+
+
+TOOL_LOADERS = {
+    'updater': _load_excel_processor,
+    'clearer': _load_excel_cleaner,
+    'compatibility': _load_excel_compatibility_processor,
+}
+
 
 class ExcelUpdaterGUI:
-    def __init__(self):
+    def __init__(self, preload_tools=True):
         self.root = tk.Tk()
         self.root.title("Excel 工具集")
         self.root.geometry("400x400")
@@ -17,7 +53,10 @@ class ExcelUpdaterGUI:
 
         self.master_file_path = ""
         self.target_folder = ""
-        self.processor = ExcelProcessor(print)
+        self.clearer_folder = ""
+        self.compatibility_folder = ""
+        self.preload_tools = preload_tools
+        self._tools = {}
 
         # 添加匹配列、内容列和更新列选择
         self.match_column_var = tk.StringVar(value="2")
@@ -78,6 +117,25 @@ class ExcelUpdaterGUI:
         self.init_clearer()
         self.init_compatibility()
 
+    def get_tool(self, name):
+        """获取工具实例，首次调用时才导入对应模块"""
+        tool = self._tools.get(name)
+        if tool is None:
+            tool = self._tools[name] = TOOL_LOADERS[name]()()
+        return tool
+
+    def _preload_tools(self):
+        """窗口显示后在后台线程中预先导入 pandas/openpyxl，工具模块仍在主线程首次使用时导入"""
+        def preload():
+            for module_name in PRELOAD_MODULES:
+                try:
+                    importlib.import_module(module_name)
+                except Exception as e:
+                    # 预加载失败不影响使用，实际执行时会再次导入并报告错误
+                    print(f"预加载模块 {module_name} 失败：{str(e)}")
+
+        threading.Thread(target=preload, daemon=True).start()
+
     def init_updater(self):
         # 统一按钮样式
         button_style = {
@@ -148,14 +206,12 @@ class ExcelUpdaterGUI:
         if file_path:
             self.master_file_path = file_path
             self.master_label.config(text=f"已选择：{os.path.basename(file_path)}")
-            self.processor.set_master_file(file_path)
 
     def select_target_folder(self):
         folder_path = filedialog.askdirectory(title="选择目标文件夹")
         if folder_path:
             self.target_folder = folder_path
             self.folder_label.config(text=f"已选择：{os.path.basename(folder_path)}")
-            self.processor.set_target_folder(folder_path)
 
     def process_files(self):
         if not self.master_file_path or not self.target_folder:
@@ -169,23 +225,24 @@ class ExcelUpdaterGUI:
             update_column = int(self.update_column_var.get()) - 1
             if match_column < 0 or content_column < 0 or update_column < 0:
                 raise ValueError("列索引必须大于0")
-            # 设置匹配列、内容列和更新列索引
-            self.processor.set_match_column(match_column)
-            self.processor.set_content_column(content_column)
-            self.processor.set_update_column(update_column)
         except ValueError as e:
             messagebox.showerror("错误", f"匹配列设置错误：{str(e)}")
             return
 
         try:
-            updated_count = self.processor.process_files()
+            processor = self.get_tool('updater')
+            processor.set_master_file(self.master_file_path)
+            processor.set_target_folder(self.target_folder)
+            # 设置匹配列、内容列和更新列索引
+            processor.set_match_column(match_column)
+            processor.set_content_column(content_column)
+            processor.set_update_column(update_column)
+            updated_count = processor.process_files()
             messagebox.showinfo("完成", f"共更新 {updated_count} 行。")
         except Exception as e:
             messagebox.showerror("错误", str(e))
 
     def init_clearer(self):
-        self.clearer = ExcelColumnClearer()
-
         # 统一按钮样式
         button_style = {
             'bg': '#4a90e2',
@@ -224,16 +281,18 @@ class ExcelUpdaterGUI:
     def select_clearer_folder(self):
         folder_path = filedialog.askdirectory(title="选择目标文件夹")
         if folder_path:
+            self.clearer_folder = folder_path
             self.clearer_folder_label.config(text=f"已选择：{os.path.basename(folder_path)}")
-            self.clearer.set_folder_path(folder_path)
 
     def clear_column(self):
         try:
             column_number = int(self.column_var.get())
             if column_number <= 0:
                 raise ValueError("列号必须大于0")
-            self.clearer.set_column_number(column_number)
-            processed_files = self.clearer.clear_column_in_files()
+            clearer = self.get_tool('clearer')
+            clearer.set_folder_path(self.clearer_folder)
+            clearer.set_column_number(column_number)
+            processed_files = clearer.clear_column_in_files()
             messagebox.showinfo("完成", f"共处理 {processed_files} 个文件。")
         except ValueError as e:
             messagebox.showerror("错误", f"列号设置错误：{str(e)}")
@@ -241,8 +300,6 @@ class ExcelUpdaterGUI:
             messagebox.showerror("错误", str(e))
 
     def init_compatibility(self):
-        self.compatibility_processor = ExcelCompatibilityProcessor()
-
         # 统一按钮样式
         button_style = {
             'bg': '#4a90e2',
@@ -272,17 +329,43 @@ class ExcelUpdaterGUI:
     def select_compatibility_folder(self):
         folder_path = filedialog.askdirectory(title="选择目标文件夹")
         if folder_path:
+            self.compatibility_folder = folder_path
             self.compatibility_folder_label.config(text=f"已选择：{os.path.basename(folder_path)}")
-            self.compatibility_processor.set_folder_path(folder_path)
 
     def process_compatibility(self):
         try:
-            processed_files = self.compatibility_processor.process_files()
+            compatibility_processor = self.get_tool('compatibility')
+            compatibility_processor.set_folder_path(self.compatibility_folder)
+            processed_files = compatibility_processor.process_files()
             messagebox.showinfo("完成", f"共处理 {processed_files} 个文件。")
         except Exception as e:
             messagebox.showerror("错误", str(e))
 
+    def _on_first_map(self, event):
+        if event.widget is not self.root:
+            return
+        self.root.unbind('<Map>')
+        if os.environ.get(STARTUP_BENCH_ENV):
+            self._report_startup()
+            return
+        if self.preload_tools:
+            # 等窗口绘制完成后再开始预加载，避免与首次绘制争抢 CPU
+            self.root.after(100, self._preload_tools)
+
+    def _report_startup(self):
+        """输出窗口显示时间及已加载的重量级模块，然后退出"""
+        heavy_modules = {
+            name.split('.')[0] for name in sys.modules
+            if name.split('.')[0] in HEAVY_MODULES
+        }
+        print(json.dumps({
+            'visible_at': time.time(),
+            'heavy_modules': sorted(heavy_modules),
+        }), flush=True)
+        self.root.after(0, self.root.destroy)
+
     def run(self):
+        self.root.bind('<Map>', self._on_first_map)
         self.root.mainloop()
 
 if __name__ == "__main__":